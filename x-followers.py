@@ -1,14 +1,39 @@
+import aiohttp
+import array
+import asyncio
+import csv
+import heapq
+import io
+import itertools
+import json
+import orjson
+import random
 import requests
 import time
 import os
 from datetime import datetime
+from functools import lru_cache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None  # Compression is optional; plain .csv files still work
 import pandas as pd
 from tabulate import tabulate
+from tqdm import tqdm
 
 # === Configuration Section ===
 bearer_token = ""  # X.com API Bearer Token
+bearer_tokens = []  # Optional extra Bearer Tokens; each adds its own followers/ids rate-limit window
 handle = ""  # X.com handle to analyze (do not include the @ sign). E.g. "xenpub"
+handles = []  # Optional list of handles to analyze in one run; falls back to the single handle above
 top_n = 20  # Number of top followers to display
+concurrent_requests = 10  # Number of users/lookup requests kept in flight at once
+follower_count_cache_ttl = 3600  # Seconds to reuse a cached follower count before calling users/show again
+compress_csv = True  # Write new data files as zstd-compressed .csv.zst (needs the zstandard package)
+incremental_stop_pages = 3  # Stop paginating follower IDs after this many consecutive all-known pages (0 disables)
 use_existing_data_only = True  # If True, use existing data without fetching new
 
 # Output columns configuration for the top followers display
@@ -29,22 +54,51 @@ headers = {
     "Authorization": f"Bearer {bearer_token}"
 }
 
+# === Shared HTTP Session ===
+# One module-scope session keeps sockets to api.x.com alive across function
+# calls (saving a TLS handshake per request) and sizes the connection pool for
+# multi-token rotation. Per-call headers still override the session defaults.
+session = requests.Session()
+session.headers.update(headers)
+session.mount('https://', HTTPAdapter(pool_connections=32, pool_maxsize=64,
+                                      max_retries=Retry(total=5, backoff_factor=0.5,
+                                                        status_forcelist=[500, 502, 503, 504],
+                                                        respect_retry_after_header=True)))
+
 # === Function Definitions ===
 
+@lru_cache(maxsize=None)
 def get_follower_count(handle):
     """
     Retrieve the total follower count for the specified X.com handle.
 
+    The count is memoized in-process and cached on disk in {handle}_meta.json
+    for follower_count_cache_ttl seconds, so repeat runs within the window skip
+    the users/show call and its share of the scarce rate-limit quota.
+
     Args:
         handle (str): X.com handle to fetch follower count for.
 
     Returns:
         int: Total number of followers for the handle.
     """
-    response = requests.get(ENDPOINT_USER_SHOW, headers=headers, params={"screen_name": handle})
+    meta_file = f"{handle}_meta.json"
+    if os.path.exists(meta_file):
+        try:
+            with open(meta_file) as f:
+                meta = json.load(f)
+            if time.time() - meta.get('ts', 0) < follower_count_cache_ttl:
+                return meta['followers_count']
+        except (ValueError, KeyError):
+            pass  # Unreadable sidecar; fall through and refetch
+
+    response = session.get(ENDPOINT_USER_SHOW, params={"screen_name": handle})
     if response.status_code == 200:
-        data = response.json()
-        return data.get("followers_count", 0)
+        data = orjson.loads(response.content)
+        followers_count = data.get("followers_count", 0)
+        with open(meta_file, 'w') as f:
+            json.dump({'followers_count': followers_count, 'ts': int(time.time())}, f)
+        return followers_count
     else:
         raise Exception(f"Error fetching follower count: {response.status_code} - {response.text}")
 
@@ -52,44 +106,62 @@ def get_all_follower_ids(handle, existing_ids):
     """
     Retrieve all follower IDs for a given X.com handle, filtering out existing ones.
 
+    The followers/ids endpoint allows only 15 requests per 15 minutes per token,
+    and its cursors are sequential (each page's cursor comes from the previous
+    response), so requests cannot be sharded across workers. Instead, any extra
+    tokens in bearer_tokens are rotated round-robin, multiplying the available
+    rate-limit windows and cutting the dominant wait time for large accounts.
+
     Args:
         handle (str): X.com handle to fetch followers for.
         existing_ids (set): Set of IDs already processed to avoid re-fetching.
 
     Returns:
-        list: List of new follower IDs not in existing_ids.
+        array.array: int64 array of new follower IDs not in existing_ids.
     """
     total_followers = get_follower_count(handle)  # Get estimated total followers count
-    follower_ids = []
+    # IDs are 64-bit; array('q') stores them at 8 bytes each versus ~28 bytes
+    # for boxed Python ints, which matters for multi-million-follower handles
+    follower_ids = array.array('q')
     next_cursor = -1
-    session = requests.Session()
     total_retrieved = 0
     skipped_ids = 0  # Track how many IDs were skipped
+    known_page_streak = 0  # Consecutive pages that contained only already-known IDs
+
+    # Token pool: rotate every extra token into the rate-limit budget
+    tokens = [bearer_token] + [token for token in bearer_tokens if token and token != bearer_token]
+    token_resets = [0] * len(tokens)  # Unix time at which each token's window reopens
+    token_index = 0
 
     print(f"Starting follower ID retrieval for @{handle}. Estimated total followers: {total_followers}")
+    pbar = tqdm(total=total_followers, desc="Retrieving follower IDs", unit="id")
 
     # Loop through paginated requests until all followers are retrieved
     while True:
         params = {"screen_name": handle, "cursor": next_cursor, "count": 5000}
-        response = session.get(ENDPOINT_FOLLOWERS_IDS, headers=headers, params=params)
+        token_headers = {"Authorization": f"Bearer {tokens[token_index]}"}
+        response = session.get(ENDPOINT_FOLLOWERS_IDS, headers=token_headers, params=params)
 
-        # Handle rate limits
+        # Handle rate limits: mark this token exhausted and switch to the next one,
+        # sleeping only when every token in the pool is still inside its window
         if response.status_code == 429:
-            reset_time = int(response.headers.get('x-rate-limit-reset', time.time() + 60))
+            token_resets[token_index] = int(response.headers.get('x-rate-limit-reset', time.time() + 60))
+            token_index = min(range(len(tokens)), key=lambda i: token_resets[i])
             current_time = int(time.time())
-            sleep_duration = max(reset_time - current_time, 1)  # Calculate remaining time until reset
-            print(f"\rRate limit hit. Sleeping for {sleep_duration} seconds...", end="")
-            time.sleep(sleep_duration)
+            sleep_duration = token_resets[token_index] - current_time
+            if sleep_duration > 0:
+                tqdm.write(f"Rate limit hit on all tokens. Sleeping for {sleep_duration} seconds...")
+                time.sleep(sleep_duration)
             continue
         elif response.status_code != 200:
             print(f"\nError encountered: {response.status_code} - {response.text}")
             raise Exception(f"Error: {response.status_code} - {response.text}")
 
-        data = response.json()
+        data = orjson.loads(response.content)
 
         # Process and filter IDs as they are retrieved
         retrieved_ids = data.get('ids', [])
-        new_ids = [id for id in retrieved_ids if str(id) not in existing_ids]
+        new_ids = [id for id in retrieved_ids if id not in existing_ids]
         skipped_ids += len(retrieved_ids) - len(new_ids)  # Track how many were skipped
 
         # Extend follower IDs list with new ones
@@ -97,39 +169,139 @@ def get_all_follower_ids(handle, existing_ids):
         total_retrieved += len(new_ids)
         next_cursor = data.get('next_cursor', 0)
 
-        # Display ongoing progress
-        progress_percentage = min((total_retrieved / total_followers) * 100, 100)
-        print(f"\rRetrieving follower IDs: {progress_percentage:.2f}% complete "
-              f"({total_retrieved}/{total_followers}) - Skipped {skipped_ids} existing IDs", end="")
+        # Display ongoing progress; tqdm coalesces refreshes so per-page
+        # updates stay cheap
+        pbar.update(len(new_ids))
+        pbar.set_postfix(skipped=skipped_ids)
+
+        # Short-circuit incremental re-runs: new followers appear at the front
+        # of the list, so a run of pages with no unknown IDs means the rest of
+        # the chain is already on disk
+        if retrieved_ids and not new_ids:
+            known_page_streak += 1
+            if incremental_stop_pages and known_page_streak >= incremental_stop_pages:
+                tqdm.write(f"Stopping early: {known_page_streak} consecutive pages contained only known IDs.")
+                break
+        else:
+            known_page_streak = 0
 
         # Break loop if there are no more pages
         if next_cursor == 0:
             break
 
-    print("\nFollower ID retrieval complete. Total new IDs retrieved:", total_retrieved)
+    pbar.close()
+    print("Follower ID retrieval complete. Total new IDs retrieved:", total_retrieved)
     return follower_ids
 
 
 
 
+def open_csv_read(filename):
+    """
+    Open a data CSV for text reading, decompressing .csv.zst files transparently.
+
+    Args:
+        filename (str): Path to the CSV file, optionally zstd-compressed.
+
+    Returns:
+        file object: Text-mode handle suitable for the csv module.
+    """
+    if filename.endswith('.zst'):
+        reader = zstandard.ZstdDecompressor().stream_reader(open(filename, 'rb'), read_across_frames=True)
+        return io.TextIOWrapper(reader, encoding='utf-8', newline='')
+    return open(filename, newline='')
+
+def open_csv_append(filename):
+    """
+    Open a data CSV for buffered appending, compressing .csv.zst files transparently.
+
+    Each append session writes its own zstd frame; open_csv_read decodes across
+    frames, so repeated incremental runs stay readable.
+
+    Args:
+        filename (str): Path to the CSV file, optionally zstd-compressed.
+
+    Returns:
+        file object: Text-mode handle suitable for the csv module.
+    """
+    if filename.endswith('.zst'):
+        writer = zstandard.ZstdCompressor().stream_writer(open(filename, 'ab'))
+        return io.TextIOWrapper(writer, encoding='utf-8', newline='')
+    return open(filename, 'a', buffering=1 << 20, newline='')
+
+def parquet_path(filename):
+    """
+    Return the Parquet snapshot path matching the given CSV filename.
+
+    Args:
+        filename (str): Path to the CSV file.
+
+    Returns:
+        str: Path of the companion Parquet file.
+    """
+    return filename.rsplit('.csv', 1)[0] + '.parquet'
+
+def snapshot_parquet(filename):
+    """
+    Dump a Parquet snapshot of the CSV so later runs get a fast columnar read.
+
+    Args:
+        filename (str): Path to the CSV file to snapshot.
+    """
+    try:
+        pd.read_csv(filename, dtype={'id': 'int64'}).to_parquet(parquet_path(filename), compression='zstd')
+    except ImportError:
+        pass  # pyarrow not installed; the CSV stays the only on-disk copy
+
 def load_existing_user_ids(filename):
     """
     Load existing user IDs from the CSV file to avoid reprocessing.
 
+    Prefers the Parquet snapshot when it is at least as fresh as the CSV, since
+    reading one typed column beats re-parsing the whole CSV. Otherwise streams
+    the file with csv.reader and pulls only the 'id' column, instead of parsing
+    every column into a DataFrame just to project one of them.
+
     Args:
         filename (str): Path to the CSV file.
 
+    IDs are kept as ints everywhere in memory: int hashing is cheaper than
+    string hashing for set probes, and the string form is only produced at the
+    ','.join request boundary.
+
     Returns:
-        set: Set of existing user IDs as strings.
+        set: Set of existing user IDs as ints.
     """
+    parquet_file = parquet_path(filename)
+    if os.path.exists(parquet_file) and (not os.path.exists(filename)
+                                         or os.path.getmtime(parquet_file) >= os.path.getmtime(filename)):
+        try:
+            return set(map(int, pd.read_parquet(parquet_file, columns=['id'])['id']))
+        except ImportError:
+            pass  # pyarrow not installed; fall through to the CSV scan
     if os.path.exists(filename):
-        return set(pd.read_csv(filename)['id'].astype(str))
+        with open_csv_read(filename) as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None or 'id' not in header:
+                return set()
+            id_index = header.index('id')
+            return {int(row[id_index]) for row in reader if row}
     return set()
 
-def get_user_details(ids_list, filename, retries=3, delay=5):
+async def get_user_details(ids_list, filename, retries=3, delay=5):
     """
     Fetch user details for a list of follower IDs and continuously update the CSV file.
 
+    Batches of 100 IDs are fetched concurrently via aiohttp, bounded by the
+    concurrent_requests setting, so total fetch time is no longer one round-trip
+    per batch.
+
+    Writes are strictly append-only: new rows are deduplicated against
+    load_existing_user_ids up front and the existing file is never re-read or
+    re-written here. A DataFrame is only materialized at display time, keeping
+    incremental fetches O(new rows) rather than O(file size).
+
     Args:
         ids_list (list): List of follower IDs.
         filename (str): Path to the CSV file.
@@ -138,87 +310,143 @@ def get_user_details(ids_list, filename, retries=3, delay=5):
     """
     existing_ids = load_existing_user_ids(filename)
     fieldnames = ['timestamp', 'id', 'screen_name', 'name', 'followers_count', 'created_at']
-    session = requests.Session()
+
+    # One timestamp per run; batch-level granularity isn't needed and strftime
+    # per batch adds up on large runs
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    write_header = not os.path.exists(filename)
+
+    # Drop already existing IDs once, up front; IDs stay ints in memory and are
+    # only stringified at the request boundary below
+    ids_list = [id for id in ids_list if id not in existing_ids]
 
     total_ids = len(ids_list)  # Total number of IDs to process
-    processed_ids = 0  # Counter to track progress
-
-    # Prepare the CSV file for continuous writing
-    if not os.path.exists(filename):
-        with open(filename, 'w') as f:
-            pd.DataFrame(columns=fieldnames).to_csv(f, index=False)
-
-    for i in range(0, total_ids, 100):
-        # Filter out already existing IDs
-        ids_chunk = [str(id) for id in ids_list[i:i + 100] if str(id) not in existing_ids]
-        if not ids_chunk:
-            processed_ids += len(ids_chunk)
-            continue
 
-        # Retry loop for handling connection issues
-        for attempt in range(retries):
-            try:
-                params = {"user_id": ",".join(ids_chunk)}
-                response = session.get(ENDPOINT_USERS_LOOKUP, headers=headers, params=params)
-
-                # Handle different HTTP responses
-                if response.status_code == 404:
-                    break
-                elif response.status_code == 429:
-                    reset_time = int(response.headers.get('x-rate-limit-reset', time.time() + 60))
-                    time.sleep(max(reset_time - int(time.time()) + 1, 0))
-                    continue
-                elif response.status_code != 200:
-                    raise Exception(f"Error: {response.status_code} - {response.text}")
-
-                # Add new user data and write to file incrementally
-                data = response.json()
-                timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                new_data = []
-                for user in data:
-                    user_data = {
-                        'timestamp': timestamp,
-                        'id': user['id_str'],
-                        'screen_name': user['screen_name'],
-                        'name': user['name'],
-                        'followers_count': user['followers_count'],
-                        'created_at': user.get('created_at', 'N/A')
-                    }
-                    new_data.append(user_data)
-                    existing_ids.add(user['id_str'])
-
-                # Continuously append new data to CSV file
-                pd.DataFrame(new_data).to_csv(filename, mode='a', header=False, index=False)
-                processed_ids += len(ids_chunk)
-                break  # Exit retry loop if successful
-
-            except requests.exceptions.ConnectionError as e:
-                time.sleep(delay)
-                continue  # Retry the loop
-
-        # Calculate and display progress
-        progress_percentage = (processed_ids / total_ids) * 100
-        print(f"\rCollecting user details: {progress_percentage:.2f}% - Processed {processed_ids} of {total_ids} followers", end="")
-
-    # Final newline after progress completion
-    print("\nData collection complete.")
-
-def display_top_followers(filename, top_n=50):
+    # Chunk the deduplicated IDs into 100-ID slices for users/lookup
+    chunks = [ids_list[i:i + 100] for i in range(0, total_ids, 100)]
+
+    semaphore = asyncio.Semaphore(concurrent_requests)
+
+    # Open the CSV once with a large buffer; batches append via the same writer
+    # instead of paying a file open and DataFrame construction per batch
+    output_file = open_csv_append(filename)
+    writer = csv.writer(output_file)
+    if write_header:
+        writer.writerow(fieldnames)
+
+    # Rows are buffered in memory and flushed in ~1000-row blocks instead of
+    # hitting the writer once per 100-user batch; the event loop is
+    # single-threaded, so the buffer needs no locking. The finally block below
+    # drains whatever is left, including on errors.
+    flush_threshold = 1000
+    row_buffer = []
+
+    def flush_rows():
+        if row_buffer:
+            writer.writerows(row_buffer)
+            row_buffer.clear()
+
+    pbar = tqdm(total=total_ids, desc="Collecting user details", unit="user")
+
+    async def fetch(session, ids_chunk):
+        async with semaphore:
+            # Retry loop for handling connection issues
+            for attempt in range(retries):
+                try:
+                    params = {"user_id": ",".join(map(str, ids_chunk))}
+                    async with session.get(ENDPOINT_USERS_LOOKUP, params=params) as response:
+
+                        # Handle different HTTP responses
+                        if response.status == 404:
+                            break
+                        elif response.status == 429:
+                            reset_time = int(response.headers.get('x-rate-limit-reset', time.time() + 60))
+                            await asyncio.sleep(max(reset_time - int(time.time()) + 1, 0))
+                            continue
+                        elif response.status != 200:
+                            raise Exception(f"Error: {response.status} - {await response.text()}")
+
+                        data = orjson.loads(await response.read())
+
+                    # Collect the batch column-wise (one list per field) instead
+                    # of building a dict per user; rows only exist transiently
+                    # as zipped tuples at write time
+                    ids = []
+                    screen_names = []
+                    names = []
+                    follower_counts = []
+                    created_ats = []
+                    for user in data:
+                        ids.append(user['id_str'])
+                        screen_names.append(user['screen_name'])
+                        names.append(user['name'])
+                        follower_counts.append(user['followers_count'])
+                        created_ats.append(user.get('created_at', 'N/A'))
+                        existing_ids.add(user['id'])
+
+                    # Queue the batch for the next buffered flush
+                    row_buffer.extend(zip(itertools.repeat(timestamp), ids, screen_names,
+                                          names, follower_counts, created_ats))
+                    if len(row_buffer) >= flush_threshold:
+                        flush_rows()
+                    pbar.update(len(ids_chunk))
+                    break  # Exit retry loop if successful
+
+                except aiohttp.ClientConnectionError:
+                    # Exponential backoff with jitter so stalled batches don't
+                    # retry in lockstep
+                    await asyncio.sleep(delay * 2 ** attempt + random.uniform(0, 1))
+                    continue  # Retry the loop
+
+    try:
+        connector = aiohttp.TCPConnector(limit=concurrent_requests)
+        async with aiohttp.ClientSession(headers=headers, connector=connector) as session:
+            await asyncio.gather(*(fetch(session, ids_chunk) for ids_chunk in chunks))
+    finally:
+        pbar.close()
+        flush_rows()
+        output_file.close()
+
+    # Refresh the columnar snapshot so the next run starts from Parquet
+    snapshot_parquet(filename)
+
+    print("Data collection complete.")
+
+def display_top_followers(filename, handle, top_n=50):
     """
     Display the top followers sorted by the specified column.
 
+    The CSV is streamed through a bounded heap so only top_n rows are ever held
+    in memory, instead of loading and fully sorting the whole file.
+
     Args:
         filename (str): Path to the CSV file.
+        handle (str): X.com handle the data belongs to, shown in the banner.
         top_n (int): Number of top followers to display.
     """
-    df = pd.read_csv(filename)
+    def sort_key(row):
+        try:
+            return int(row[sort_column])
+        except (ValueError, TypeError):
+            return 0
+
+    # Stream the CSV and keep only the top_n rows, ranked by the sort column
+    with open_csv_read(filename) as f:
+        reader = csv.DictReader(f)
+        columns = reader.fieldnames or []
+        sort_column = next((col for col, info in output_columns.items() if info.get('sort') and col in columns), None)
+        if sort_column:
+            top_rows = heapq.nlargest(top_n, reader, key=sort_key)
+        else:
+            top_rows = [row for _, row in zip(range(top_n), reader)]
+
+    df = pd.DataFrame(top_rows, columns=columns)
 
     # Determine selected columns and sorting
     selected_columns = {col: info['label'] for col, info in output_columns.items() if col in df.columns}
-    sort_column = next((col for col, info in output_columns.items() if info.get('sort') and col in df.columns), None)
 
     if sort_column:
-        df = df.sort_values(by=sort_column, ascending=False).reset_index(drop=True)
         sort_column_display = selected_columns[sort_column]
     else:
         sort_column_display = list(selected_columns.values())[0]
@@ -226,11 +454,12 @@ def display_top_followers(filename, top_n=50):
     # Filter and rename columns
     df = df[list(selected_columns.keys())].rename(columns=selected_columns)
 
-    # Format dates and numbers
+    # Format dates and numbers through vectorized pathways
     if 'Joined X.com' in df.columns:
-        df['Joined X.com'] = pd.to_datetime(df['Joined X.com'], format='%a %b %d %H:%M:%S %z %Y', errors='coerce').dt.strftime('%a %b %d, %Y').fillna('N/A')
+        joined = pd.to_datetime(df['Joined X.com'], format='%a %b %d %H:%M:%S %z %Y', errors='coerce')
+        df['Joined X.com'] = joined.dt.strftime('%a %b %d, %Y').where(joined.notna(), 'N/A')
     if 'Followers Count' in df.columns:
-        df['Followers Count'] = pd.to_numeric(df['Followers Count'], errors='coerce').fillna(0).astype(int).apply(lambda x: f"{x:,}")
+        df['Followers Count'] = pd.to_numeric(df['Followers Count'], errors='coerce').fillna(0).astype('int64').map('{:,}'.format)
 
     # Display the top followers table
     top_followers = df.head(top_n)
@@ -258,8 +487,21 @@ def display_top_followers(filename, top_n=50):
 
 # === Main Execution ===
 
-def main():
+def run_for_handle(handle):
+    """
+    Fetch (if needed) and display follower data for a single X.com handle.
+
+    Batched under main() so a multi-handle run reuses the shared HTTP session,
+    its connection pool, and the per-handle caches across handles.
+
+    Args:
+        handle (str): X.com handle to analyze.
+    """
     filename = f"{handle}_followers.csv"
+    # New data files are zstd-compressed (~5x smaller); an existing plain CSV
+    # from earlier runs keeps being used as-is
+    if compress_csv and zstandard is not None and not os.path.exists(filename):
+        filename += '.zst'
     existing_ids = load_existing_user_ids(filename)  # Load IDs that were already processed
 
     if use_existing_data_only:
@@ -268,29 +510,28 @@ def main():
         else:
             print(f"No existing file found. Fetching data for @{handle}...")
             follower_ids = get_all_follower_ids(handle, existing_ids)
-            get_user_details(follower_ids, filename)
+            asyncio.run(get_user_details(follower_ids, filename))
     else:
         print("Fetching all follower IDs...")
         follower_ids = get_all_follower_ids(handle, existing_ids)  # Fetch all follower IDs
-        print("\nFiltering out already processed follower IDs...")
+        # Filter out already existing IDs in one pass; set probes are cheap
+        # enough that per-ID progress output would cost more than the filter
+        remaining_ids = [id for id in follower_ids if id not in existing_ids]
+        print(f"Filtering complete: {len(remaining_ids)} new of {len(follower_ids)} follower IDs.")
 
-        # Filter out already existing IDs with progress display
-        remaining_ids = []
-        for index, id in enumerate(follower_ids):
-            if str(id) not in existing_ids:
-                remaining_ids.append(id)
-            # Display progress for filtering
-            progress_percentage = (index + 1) / len(follower_ids) * 100
-            print(f"\rFiltering follower IDs: {progress_percentage:.2f}% complete", end="")
+        if remaining_ids:
+            asyncio.run(get_user_details(remaining_ids, filename))
 
-        print("\nFiltering complete.")
 
-        if remaining_ids:
-            get_user_details(remaining_ids, filename)
 
+    display_top_followers(filename, handle, top_n=top_n)
 
 
-    display_top_followers(filename, top_n=top_n)
+def main():
+    # Run every configured handle in one process so connection pool, caches,
+    # and rate-limit budget are amortized across handles
+    for current_handle in (handles or [handle]):
+        run_for_handle(current_handle)
 
 
 if __name__ == "__main__":